@@ -1,54 +1,125 @@
+import time
 
-from flask import Flask, jsonify
-from flask_cors import CORS
-import vertexai
+_BOOT_TIME = time.time()
 
+import os
 
-from config import PROJECT_ID, REGION
+from flask import Flask, g, jsonify, request
+from flask_cors import CORS
 
 
-from services.vertex_ai_service import initialize_vertex_ai_service
+from utils.response_utils import CompactJSONProvider, compress_response
+from services.prefetch_service import begin_foreground_request, end_foreground_request
+from services.profiling_service import (
+    should_profile, start_profile, finish_profile, abort_profile, profile_report_id
+)
 
 
 from routes.analysis_routes import analysis_bp, set_document_store as set_analysis_document_store
 from routes.roadmap_routes import roadmap_bp, set_document_store as set_roadmap_document_store
+from routes.health_routes import health_bp, mark_app_loaded
+from routes.admin_routes import admin_bp
 
 app = Flask(__name__)
+app.json = CompactJSONProvider(app)
 CORS(app)
 
 
 _document_store = {
     "prd_content": None,
-    "feedback_content": None
+    "feedback_content": None,
+    "prd_analysis": None,
+    "feedback_analysis": None,
+    "version": 0
 }
 
-
-with app.app_context():
-    try:
-        initialize_vertex_ai_service()
-        set_analysis_document_store(_document_store)
-        set_roadmap_document_store(_document_store)
-    except Exception as e:
-        print(f"CRITICAL ERROR: Failed to initialize Vertex AI or set up document store: {e}")
-      
-        exit(1) 
+# Vertex AI is initialized lazily on first use (see ensure_vertex_ai_service), so
+# a preloading server can import this module before forking its workers.
+set_analysis_document_store(_document_store)
+set_roadmap_document_store(_document_store)
 
 
 app.register_blueprint(analysis_bp)
 app.register_blueprint(roadmap_bp)
+app.register_blueprint(health_bp)
+app.register_blueprint(admin_bp)
+
+
+@app.before_request
+def track_foreground_request():
+    if request.method == "POST" and request.blueprint in ("analysis_routes", "roadmap_routes"):
+        g.foreground_request = True
+        begin_foreground_request()
+
+
+@app.teardown_request
+def untrack_foreground_request(exc):
+    if g.pop("foreground_request", False):
+        end_foreground_request()
+
+
+@app.before_request
+def start_request_profile():
+    if request.blueprint != "admin_routes" and should_profile(request):
+        profile_state = start_profile()
+        if profile_state is not None:
+            g.profile_state = profile_state
+
+
+# Registered before compression so it runs after it and the report includes it.
+@app.after_request
+def finish_request_profile(response):
+    profile_state = g.pop("profile_state", None)
+    if profile_state is None:
+        return response
+
+    request_path, method, status_code = request.path, request.method, response.status_code
+
+    def write_report():
+        try:
+            return finish_profile(profile_state, request_path, method, status_code)
+        except Exception as e:
+            print(f"ERROR: Failed to write profile report for {request_path}: {e}")
+
+    if response.is_streamed:
+        # The body is generated after this hook returns, so keep profiling until
+        # the stream is closed.
+        response.headers["X-Profile-Report"] = profile_report_id(profile_state, request_path)
+        response.call_on_close(write_report)
+    else:
+        report_id = write_report()
+        if report_id:
+            response.headers["X-Profile-Report"] = report_id
+    return response
+
+
+@app.teardown_request
+def abort_request_profile(exc):
+    profile_state = g.pop("profile_state", None)
+    if profile_state is not None:
+        abort_profile(profile_state)
+
+
+@app.after_request
+def compress_after_request(response):
+    return compress_response(response, request)
 
 @app.route('/')
 def home():
     return jsonify({"message": "Product Strategist Backend is running!"})
 
 
+mark_app_loaded(_BOOT_TIME)
+
+
 if __name__ == '__main__':
+    port = int(os.environ.get("PORT", 5000))
     print("Attempting to start Flask app...")
     try:
-        app.run(debug=True, port=5000)
+        app.run(debug=True, port=port)
     except OSError as e:
-        print(f"ERROR: Could not start Flask app. Port 5000 might be in use or another network issue occurred: {e}")
-        print("Please ensure no other applications are using port 5000.")
-        print("You can try changing the port in app.run(port=XXXX) or kill the process using port 5000.")
+        print(f"ERROR: Could not start Flask app. Port {port} might be in use or another network issue occurred: {e}")
+        print(f"Please ensure no other applications are using port {port}.")
+        print("You can try setting the PORT environment variable or kill the process using the port.")
     except Exception as e:
         print(f"An unexpected error occurred during Flask app startup: {e}")
@@ -1,3 +1,35 @@
+import os
+
 PROJECT_ID = "" 
 REGION = ""
 MODEL_NAME = ""
+
+BATCH_MAX_PROMPTS = 50
+BATCH_MAX_CONCURRENCY = 4
+
+# Background prefetch of common first follow-ups after /initial-analysis.
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "false").lower() == "true"
+PREFETCH_MAX_CALLS_PER_UPLOAD = int(os.environ.get("PREFETCH_MAX_CALLS_PER_UPLOAD", "3"))
+PREFETCH_IDLE_POLL_SECONDS = 0.5
+PREFETCH_IDLE_TIMEOUT_SECONDS = 120
+PREFETCH_WAIT_TIMEOUT_SECONDS = 60
+RESPONSE_CACHE_MAX_ENTRIES = 64
+RESPONSE_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+# AI call record/replay: "off", "record" (call Vertex AI and append to the archive)
+# or "replay" (serve archived responses without calling Vertex AI).
+AI_REPLAY_MODE = os.environ.get("AI_REPLAY_MODE", "off")
+AI_RECORDINGS_PATH = os.environ.get("AI_RECORDINGS_PATH", "recordings/ai_calls.jsonl.gz")
+AI_REPLAY_LATENCY_SCALE = float(os.environ.get("AI_REPLAY_LATENCY_SCALE", "1.0"))
+AI_REPLAY_STRICT = os.environ.get("AI_REPLAY_STRICT", "true").lower() == "true"
+
+# Opt-in request profiling: requests sent with PROFILE_HEADER set to "1" and a valid
+# X-Admin-Token, or a random PROFILE_SAMPLE_RATE fraction of requests, get a
+# cProfile + tracemalloc report. PROFILE_ADMIN_TOKEN must be set for the header and
+# the /admin/profiles endpoint to work.
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_HEADER = "X-Profile-Request"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_REPORTS = 50
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")
@@ -0,0 +1,28 @@
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# The document store, response cache and prefetch state live in process memory, so
+# a second worker would not see documents uploaded to the first. Scale with threads;
+# running more workers needs a shared document store first.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_class = "gthread"
+# AI calls routinely take tens of seconds, and batch requests stream for longer.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app (Flask, routes, vertexai SDK) once in the master and share it with
+# workers copy-on-write. Vertex AI itself is initialized in post_fork, because its
+# gRPC channels must not be created before forking.
+preload_app = True
+
+
+def post_fork(server, worker):
+    from services.vertex_ai_service import ensure_vertex_ai_service
+
+    try:
+        ensure_vertex_ai_service()
+    except Exception as e:
+        # Keep the worker up; /readyz reports not_ready and retries initialization.
+        server.log.error(f"Vertex AI initialization failed in worker {worker.pid}: {e}")
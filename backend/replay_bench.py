@@ -0,0 +1,133 @@
+"""
+Offline regression and performance check against recorded AI calls.
+
+Record real traffic first with AI_REPLAY_MODE=record, then run:
+
+    python replay_bench.py [--archive PATH] [--requests N] [--latency-scale X]
+
+Every recording is re-parsed (including JSON repair) and its output shape is
+compared with the shape seen when it was recorded. The endpoints are then
+exercised through the Flask test client with AI calls replayed from the archive.
+Exits with status 1 if any recording no longer parses to the same shape.
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def _timed(fn, *args):
+    start_time = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start_time
+
+
+def check_recordings(recordings):
+    from services.vertex_ai_service import parse_ai_response_text
+    from services.ai_replay_service import response_shape
+    from routes.analysis_routes import build_prd_markdown, build_feedback_markdown
+
+    parse_times = []
+    markdown_times = []
+    regressions = 0
+
+    for index, recording in enumerate(recordings):
+        if recording["text"] is None:
+            continue
+        parsed_result, elapsed = _timed(parse_ai_response_text, recording["text"])
+        parse_times.append(elapsed)
+
+        if response_shape(parsed_result) != recording["shape"]:
+            regressions += 1
+            print(f"SHAPE REGRESSION in recording {index}: expected {recording['shape']}, got {response_shape(parsed_result)}")
+            continue
+
+        if isinstance(parsed_result, dict) and "bulletPoints" in parsed_result:
+            _, elapsed = _timed(build_prd_markdown, parsed_result)
+            markdown_times.append(elapsed)
+        elif isinstance(parsed_result, dict) and "categoryCounts" in parsed_result:
+            _, elapsed = _timed(build_feedback_markdown, parsed_result)
+            markdown_times.append(elapsed)
+
+    _print_timings("parse/repair", parse_times)
+    _print_timings("markdown", markdown_times)
+    return regressions
+
+
+def bench_endpoints(request_count):
+    from app import app
+
+    client = app.test_client()
+    analysis_body = {
+        "prdContent": "Replay benchmark PRD.",
+        "feedbackContent": "Replay benchmark feedback."
+    }
+
+    timings = {"/initial-analysis": [], "/generate-roadmap": []}
+    for _ in range(request_count):
+        start_time = time.perf_counter()
+        response = client.post("/initial-analysis", json=analysis_body)
+        timings["/initial-analysis"].append(time.perf_counter() - start_time)
+        if response.status_code != 200:
+            print(f"/initial-analysis returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+        start_time = time.perf_counter()
+        response = client.post("/generate-roadmap", json={"prompt": "Create a roadmap for next quarter", "chatHistory": []})
+        timings["/generate-roadmap"].append(time.perf_counter() - start_time)
+        if response.status_code != 200:
+            print(f"/generate-roadmap returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    for endpoint, endpoint_timings in timings.items():
+        _print_timings(endpoint, endpoint_timings)
+
+
+def _print_timings(label, timings):
+    if not timings:
+        print(f"{label}: no samples")
+        return
+    timings = sorted(timings)
+    total = sum(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"{label}: n={len(timings)} mean={total / len(timings) * 1000:.2f}ms "
+        f"p95={p95 * 1000:.2f}ms max={timings[-1] * 1000:.2f}ms "
+        f"throughput={len(timings) / total:.1f}/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", help="Recordings archive (defaults to AI_RECORDINGS_PATH)")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per endpoint (0 to skip)")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Scale for replayed AI latency (1 = original)")
+    args = parser.parse_args()
+
+    # config.py reads these at import time, so set them before importing the app.
+    os.environ["AI_REPLAY_MODE"] = "replay"
+    os.environ["AI_REPLAY_LATENCY_SCALE"] = str(args.latency_scale)
+    # The endpoint run uses synthetic documents, so it relies on the same-config
+    # fallback; requests are sent one at a time, which keeps it deterministic.
+    if args.requests > 0:
+        os.environ["AI_REPLAY_STRICT"] = "false"
+    if args.archive:
+        os.environ["AI_RECORDINGS_PATH"] = args.archive
+
+    from services.ai_replay_service import load_recordings
+    from config import AI_RECORDINGS_PATH
+
+    recordings = load_recordings(AI_RECORDINGS_PATH)
+    if not recordings:
+        print(f"No recordings found in {AI_RECORDINGS_PATH}")
+        return 1
+    print(f"Loaded {len(recordings)} recordings from {AI_RECORDINGS_PATH}")
+
+    regressions = check_recordings(recordings)
+    if args.requests > 0:
+        bench_endpoints(args.requests)
+
+    print(f"{regressions} shape regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
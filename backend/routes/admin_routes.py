@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from config import PROFILING_ENABLED, PROFILE_ADMIN_TOKEN
+from services.profiling_service import has_valid_admin_token, load_recent_reports, summarize_reports
+
+admin_bp = Blueprint('admin_routes', __name__)
+
+
+@admin_bp.route('/admin/profiles', methods=['GET'])
+def profiles_endpoint():
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled. Set PROFILING_ENABLED=true to enable it."}), 404
+    if not PROFILE_ADMIN_TOKEN:
+        return jsonify({"error": "Set PROFILE_ADMIN_TOKEN to enable the profiling admin endpoint."}), 403
+    if not has_valid_admin_token(request):
+        return jsonify({"error": "Invalid or missing admin token"}), 403
+
+    try:
+        limit = int(request.args.get('limit', 20))
+        top = int(request.args.get('top', 20))
+    except ValueError:
+        return jsonify({"error": "'limit' and 'top' must be integers"}), 400
+
+    reports = load_recent_reports(limit)
+    summary = summarize_reports(reports, top)
+    return jsonify({
+        "reports": [
+            {
+                "id": report["id"],
+                "path": report["path"],
+                "method": report["method"],
+                "status": report["status"],
+                "durationSeconds": report["durationSeconds"],
+                "peakTracedBytes": report["peakTracedBytes"]
+            }
+            for report in reports
+        ],
+        "hotspots": summary["hotspots"],
+        "allocationSites": summary["allocationSites"]
+    })
@@ -1,10 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import base64
 import time
 from threading import Thread
 from utils.pdf_extractor import extract_text_from_pdf
 from services.vertex_ai_service import generate_content_with_ai, SAFETY_SETTINGS_RELAXED
 from vertexai.generative_models import GenerationConfig
+from services.prefetch_service import cancel_prefetch
+from services.profiling_service import profile_thread_target
+from routes.roadmap_routes import schedule_roadmap_prefetch
 
 analysis_bp = Blueprint('analysis_routes', __name__)
 _document_store_ref = {}
@@ -15,6 +18,46 @@ FEEDBACK_CATEGORIES = [
     "Stability", "Design", "Reliability"
 ]
 
+def _list_to_md(title, items):
+    md = f"**{title}:**\n"
+    if items:
+        md += "".join([f"- {item}\n" for item in items])
+    else:
+        md += "- None available.\n"
+    return md + "\n"
+
+
+def build_prd_markdown(prd_analysis_result):
+    prd_md = "# Product Requirements Document (PRD) Summary\n\n"
+    prd_md += f"**Overall Summary:** {prd_analysis_result.get('summary', 'N/A')}\n\n"
+    prd_md += _list_to_md("Key Bullet Points", prd_analysis_result.get("bulletPoints", []))
+    prd_md += _list_to_md("Key Features", prd_analysis_result.get("keyFeatures", []))
+    prd_md += _list_to_md("Success Metrics", prd_analysis_result.get("successMetrics", []))
+    prd_md += _list_to_md("Technical Requirements", prd_analysis_result.get("technicalRequirements", []))
+    return prd_md
+
+
+def build_feedback_markdown(feedback_analysis_result):
+    feedback_md = "# User Feedback Analytics\n\n"
+    feedback_md += f"**Total Feedback Items:** {feedback_analysis_result.get('total', 0)}\n"
+    feedback_md += f"**Positive:** {feedback_analysis_result.get('positive', 0)}\n"
+    feedback_md += f"**Negative:** {feedback_analysis_result.get('negative', 0)}\n"
+    feedback_md += f"**Neutral:** {feedback_analysis_result.get('neutral', 0)}\n\n"
+
+    feedback_md += "**Key Insights:**\n"
+    for sentiment in ['positive', 'negative', 'neutral']:
+        for item in feedback_analysis_result['summaries'].get(sentiment, []):
+            feedback_md += f"- {item}\n"
+    feedback_md += "\n"
+
+    feedback_md += "**Category Counts:**\n"
+    for cat in FEEDBACK_CATEGORIES:
+        count = feedback_analysis_result['categoryCounts'].get(cat, 0)
+        feedback_md += f"- {cat}: {count}\n"
+    feedback_md += "\n"
+    return feedback_md
+
+
 @analysis_bp.route('/initial-analysis', methods=['POST'])
 def initial_analysis_endpoint():
     global _document_store_ref
@@ -24,6 +67,7 @@ def initial_analysis_endpoint():
         prd_content_raw = data.get('prdContent')
         feedback_content_raw = data.get('feedbackContent')
         is_prd_pdf = data.get('isPrdPdf', False)
+        include_downloadable_summaries = data.get('includeDownloadableSummaries', True)
 
         if not prd_content_raw:
             return jsonify({"error": "PRD content is required for initial analysis"}), 400
@@ -45,8 +89,12 @@ def initial_analysis_endpoint():
         else:
             parsed_prd_content = prd_content_raw
 
+        cancel_prefetch()
+        _document_store_ref["version"] = _document_store_ref.get("version", 0) + 1
         _document_store_ref["prd_content"] = parsed_prd_content
         _document_store_ref["feedback_content"] = feedback_content_raw
+        _document_store_ref["prd_analysis"] = None
+        _document_store_ref["feedback_analysis"] = None
 
         
         prd_analysis_prompt = f"""
@@ -133,8 +181,8 @@ def initial_analysis_endpoint():
                 print(f"Feedback AI call error: {e}")
                 results['feedback'] = None
 
-        t1 = Thread(target=analyze_prd)
-        t2 = Thread(target=analyze_feedback)
+        t1 = Thread(target=profile_thread_target(analyze_prd))
+        t2 = Thread(target=profile_thread_target(analyze_feedback))
 
         t1.start()
         t2.start()
@@ -152,50 +200,22 @@ def initial_analysis_endpoint():
             "categoryCounts": {cat: 0 for cat in FEEDBACK_CATEGORIES}
         }
 
-       
-        prd_md = "# Product Requirements Document (PRD) Summary\n\n"
-        prd_md += f"**Overall Summary:** {prd_analysis_result.get('summary', 'N/A')}\n\n"
-
-        def list_to_md(title, items):
-            md = f"**{title}:**\n"
-            if items:
-                md += "".join([f"- {item}\n" for item in items])
-            else:
-                md += "- None available.\n"
-            return md + "\n"
-
-        prd_md += list_to_md("Key Bullet Points", prd_analysis_result.get("bulletPoints", []))
-        prd_md += list_to_md("Key Features", prd_analysis_result.get("keyFeatures", []))
-        prd_md += list_to_md("Success Metrics", prd_analysis_result.get("successMetrics", []))
-        prd_md += list_to_md("Technical Requirements", prd_analysis_result.get("technicalRequirements", []))
-
-        feedback_md = "# User Feedback Analytics\n\n"
-        feedback_md += f"**Total Feedback Items:** {feedback_analysis_result.get('total', 0)}\n"
-        feedback_md += f"**Positive:** {feedback_analysis_result.get('positive', 0)}\n"
-        feedback_md += f"**Negative:** {feedback_analysis_result.get('negative', 0)}\n"
-        feedback_md += f"**Neutral:** {feedback_analysis_result.get('neutral', 0)}\n\n"
-
-        feedback_md += "**Key Insights:**\n"
-        for sentiment in ['positive', 'negative', 'neutral']:
-            for item in feedback_analysis_result['summaries'].get(sentiment, []):
-                feedback_md += f"- {item}\n"
-        feedback_md += "\n"
-
-        feedback_md += "**Category Counts:**\n"
-        for cat in FEEDBACK_CATEGORIES:
-            count = feedback_analysis_result['categoryCounts'].get(cat, 0)
-            feedback_md += f"- {cat}: {count}\n"
-        feedback_md += "\n"
-
         total_time = time.time() - start_time
         print(f"/initial-analysis total time: {total_time:.2f} seconds")
 
-        return jsonify({
+        _document_store_ref["prd_analysis"] = prd_analysis_result
+        _document_store_ref["feedback_analysis"] = feedback_analysis_result
+        schedule_roadmap_prefetch()
+
+        response_body = {
             "prdAnalysis": prd_analysis_result,
-            "feedbackAnalysis": feedback_analysis_result,
-            "prdDownloadableSummary": prd_md,
-            "feedbackDownloadableSummary": feedback_md
-        })
+            "feedbackAnalysis": feedback_analysis_result
+        }
+        if include_downloadable_summaries:
+            response_body["prdDownloadableSummary"] = build_prd_markdown(prd_analysis_result)
+            response_body["feedbackDownloadableSummary"] = build_feedback_markdown(feedback_analysis_result)
+
+        return jsonify(response_body)
 
     except ValueError as e:
         return jsonify({"error": f"AI analysis error: {str(e)}"}), 500
@@ -204,6 +224,27 @@ def initial_analysis_endpoint():
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
 
+@analysis_bp.route('/analysis-summary/<kind>', methods=['GET'])
+def analysis_summary_endpoint(kind):
+    """
+    Renders the downloadable markdown summary for the last stored analysis on demand,
+    so /initial-analysis does not have to embed it in every response.
+    """
+    builders = {
+        "prd": ("prd_analysis", build_prd_markdown),
+        "feedback": ("feedback_analysis", build_feedback_markdown),
+    }
+    if kind not in builders:
+        return jsonify({"error": "Summary kind must be 'prd' or 'feedback'"}), 404
+
+    store_key, build_markdown = builders[kind]
+    analysis_result = _document_store_ref.get(store_key)
+    if analysis_result is None:
+        return jsonify({"error": "No analysis found in backend store. Please upload documents first via /initial-analysis."}), 404
+
+    return Response(build_markdown(analysis_result), mimetype='text/markdown')
+
+
 def set_document_store(store):
     global _document_store_ref
     _document_store_ref = store
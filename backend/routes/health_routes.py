@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify
+import os
+import time
+from services.vertex_ai_service import ensure_vertex_ai_service, is_vertex_ai_service_ready, get_vertex_ai_initialized_at
+
+health_bp = Blueprint('health_routes', __name__)
+_startup_times = {
+    "boot": time.time(),
+    "loaded": None
+}
+
+
+def mark_app_loaded(boot_time=None):
+    """
+    Records when the app finished importing. boot_time, if given, is taken as the
+    process start so cold-start time includes the heavy imports before it.
+    """
+    if boot_time is not None:
+        _startup_times["boot"] = boot_time
+    _startup_times["loaded"] = time.time()
+
+
+def _elapsed_since_boot(timestamp):
+    if timestamp is None:
+        return None
+    return round(timestamp - _startup_times["boot"], 3)
+
+
+@health_bp.route('/healthz', methods=['GET'])
+def liveness_endpoint():
+    return jsonify({"status": "alive", "pid": os.getpid()})
+
+
+@health_bp.route('/readyz', methods=['GET'])
+def readiness_endpoint():
+    if not is_vertex_ai_service_ready():
+        try:
+            ensure_vertex_ai_service()
+        except Exception as e:
+            return jsonify({"status": "not_ready", "error": f"Vertex AI not initialized: {str(e)}"}), 503
+
+    return jsonify({
+        "status": "ready",
+        "pid": os.getpid(),
+        "loadSeconds": _elapsed_since_boot(_startup_times["loaded"]),
+        "readySeconds": _elapsed_since_boot(get_vertex_ai_initialized_at())
+    })
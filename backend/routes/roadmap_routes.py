@@ -1,117 +1,143 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from services.vertex_ai_service import generate_content_with_ai, SAFETY_SETTINGS_RELAXED
 from vertexai.generative_models import GenerationConfig
 from datetime import datetime, timedelta
+from config import BATCH_MAX_PROMPTS, BATCH_MAX_CONCURRENCY
+from services.prefetch_service import schedule_prefetch, take_prefetched_response, get_prefetch_stats
+from services.response_cache import get_response_cache_stats
+from services.profiling_service import profile_thread_target
 
 roadmap_bp = Blueprint('roadmap_routes', __name__)
 _document_store_ref = {}
 
-@roadmap_bp.route('/generate-roadmap', methods=['POST'])
-def generate_roadmap_endpoint():
-    global _document_store_ref
 
-    try:
-        data = request.get_json()
-        user_prompt = data.get('prompt', '').strip()
-        chat_history_raw = data.get('chatHistory', [])
-
-        if not user_prompt:
-            return jsonify({"error": "Prompt is required"}), 400
-
-        
-        if user_prompt.lower() in {"hi", "hello", "hey", "yo", "sup"}:
-            return jsonify({
-                "roadmap": { 
-                    "type": "qa_response",
-                    "overview_text": "Hi there! 👋 I’m your AI Product Strategy Assistant. You can ask me to create a roadmap, summarize feedback, suggest next features, or even prioritize using frameworks like RICE or MoSCoW.",
-                    "answer": "Hi there! 👋 I’m your AI Product Strategy Assistant. You can ask me to create a roadmap, summarize feedback, suggest next features, or even prioritize using frameworks like RICE or MoSCoW.",
-                    "evidence": [],
-                    "recommendation": "Try asking something like: 'What should we build next?' or 'Create a roadmap for Q4 2025.'"
+GREETING_PROMPTS = {"hi", "hello", "hey", "yo", "sup"}
+
+GREETING_RESPONSE = {
+    "type": "qa_response",
+    "overview_text": "Hi there! 👋 I’m your AI Product Strategy Assistant. You can ask me to create a roadmap, summarize feedback, suggest next features, or even prioritize using frameworks like RICE or MoSCoW.",
+    "answer": "Hi there! 👋 I’m your AI Product Strategy Assistant. You can ask me to create a roadmap, summarize feedback, suggest next features, or even prioritize using frameworks like RICE or MoSCoW.",
+    "evidence": [],
+    "recommendation": "Try asking something like: 'What should we build next?' or 'Create a roadmap for Q4 2025.'"
+}
+
+
+ROADMAP_GENERATION_CONFIG = GenerationConfig(
+    temperature=0.7,
+    max_output_tokens=8192,
+    response_mime_type="application/json",
+    response_schema={
+        "type": "OBJECT",
+        "properties": {
+            "type": {"type": "STRING", "enum": ["roadmap", "feature_brief", "bug_list", "strategic_summary", "qa_response"]},
+            "overview_text": {"type": "STRING"},
+
+            "initiatives": {
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "name": {"type": "STRING"},
+                        "goal": {"type": "STRING"},
+                        "features": {
+                            "type": "ARRAY",
+                            "items": {
+                                "type": "OBJECT",
+                                "properties": {
+                                    "name": {"type": "STRING"},
+                                    "priority": {"type": "STRING", "enum": ["Highest", "High", "Medium", "Low"]},
+                                    "quarter": {"type": "STRING"},
+                                    "justification": {"type": "STRING"},
+                                    "startDate": {"type": "STRING", "format": "date"},
+                                    "endDate": {"type": "STRING", "format": "date"},
+                                    "status": {"type": "STRING"},
+                                    "assignee": {"type": "STRING"},
+                                    "progress": {"type": "INTEGER", "minimum": 0, "maximum": 100},
+                                    "references": {
+                                        "type": "ARRAY",
+                                        "items": {
+                                            "type": "OBJECT",
+                                            "properties": {
+                                                "source": {"type": "STRING"},
+                                                "quote": {"type": "STRING"}
+                                            },
+                                            "required": ["source", "quote"]
+                                        }
+                                    }
+                                },
+                                "required": ["name", "priority", "quarter", "justification", "startDate", "endDate", "status", "assignee", "progress", "references"]
+                            }
+                        }
+                    },
+                    "required": ["name", "goal", "features"]
                 }
-            })
-
-        prd_content_raw = _document_store_ref.get("prd_content")
-        feedback_content = _document_store_ref.get("feedback_content")
-
-        if prd_content_raw is None or feedback_content is None:
-            return jsonify({"error": "PRD and/or User Feedback content not found in backend store. Please upload documents first via /initial-analysis."}), 400
-
-        current_date = datetime.now()
-        current_quarter_num = (current_date.month - 1) // 3 + 1
-        current_quarter_year = current_date.year
-        current_quarter = f"Q{current_quarter_num} {current_quarter_year}"
-
-       
-        next_quarter_month = (current_quarter_num * 3 % 12) + 1
-        next_quarter_year = current_quarter_year
-        if next_quarter_month == 1: 
-            next_quarter_year += 1
-        next_quarter_start = datetime(next_quarter_year, next_quarter_month, 1)
-        next_quarter_num = (next_quarter_start.month - 1) // 3 + 1
-        next_quarter = f"Q{next_quarter_num} {next_quarter_year}"
-
-        
-        product_name = "Your AI-Powered Collaboration Platform" 
-
-
-       
-        system_instruction = f"""
-        You are an AI-powered Product Strategy Assistant. Your primary goal is to provide helpful, strategic responses based on the provided Product Requirements Document (PRD) and recent user feedback.
-
-        First, **CAREFULLY ANALYZE THE USER'S PROMPT TO DETERMINE THEIR EXPLICIT INTENT.**
-
-        **PRIORITIZATION FOR INTENT CLASSIFICATION:**
-        1. If the user explicitly asks for "bug fixes", "bugs list", or "top bugs", the intent is "bug_list".
-        2. If the user explicitly asks for a "feature brief", "details on a feature", or "brief for [feature name]", the intent is "feature_brief".
-        3. If the user asks for a "roadmap", "plan for QX", "next quarter's initiatives", the intent is "roadmap".
-        4. If the user asks for a "strategic summary", "overall strategy", or "high-level goals", the intent is "strategic_summary".
-        5. For all other general questions, greetings, or unclear requests, the intent is "qa_response".
-
-        **CRITICAL RULE:** If the user's prompt clearly matches one of the explicit intent keywords (e.g., "bug fixes", "feature brief", "roadmap", "strategic summary"), **YOU MUST generate that specific JSON 'type' and its associated structured data.** Do not default to 'qa_response' or 'roadmap' if another type is explicitly requested and better fits.
-
-        **ANALYZE THE USER'S PROMPT FOR MULTIPLE REQUESTS:**
-        - Users may ask for multiple things: "List top 5 bugs AND create a roadmap that addresses them"
-        - Users may ask for combined analysis: "What bugs should we fix in Q4 roadmap?"
-        - Users may ask sequential questions: "Show me bugs, then roadmap to fix them"
-
-        **RESPONSE STRATEGY FOR MULTI-INTENT REQUESTS:**
-        1. If the user asks for MULTIPLE distinct things (e.g., "bugs AND roadmap"), determine the **primary** requested type (e.g., if they end with 'roadmap', then it's 'roadmap').
-        2. Generate the **primary type's JSON structure**.
-        3. **Integrate the secondary analysis/information into the `overview_text` of the primary type.**
-        4. Ensure the structured data (e.g., 'features' in a roadmap) *explicitly* addresses and incorporates the secondary information (e.g., specific bug fixes within a 'stability' initiative).
-        
-        **ANALYZE USER'S SPECIFIC REQUIREMENTS:**
-
- **Document Source Requirements:**
-   - If user says "only PRD" / "based on PRD" / "PRD only" → Use ONLY PRD Strategic Direction, ignore user feedback
-   - If user says "only user feedback" / "based on feedback" / "user requests only" → Use ONLY User Feedback, ignore PRD
-   - If user says "only tech debt" → Focus on technical improvements, use both docs for context but generate tech-focused features
-   - Otherwise → Use both PRD and User Feedback (default behavior)
-
-        **SPECIAL HANDLING FOR "bugs AND roadmap" requests:**
-        - **Primary type:** "roadmap"
-        - **Include bug analysis in the `overview_text` under a "## Key Issues Identified" section.** This should list the top bugs.
-        - **Reference specific bugs in feature justifications** within the `initiatives` array.
-        - **Ensure the roadmap actually addresses the identified issues** by including initiatives/features focused on these bug fixes (e.g., a "Stability Initiative").
-
-        For ALL responses, include a natural language 'overview_text' that summarizes the main points or directly answers the user's question. This text should be well-formatted using markdown.
-
-        ### Current Context:
-        - Current Date: {current_date.strftime('%Y-%m-%d')}
-        - Current Quarter: {current_quarter}
-        - Next Quarter: {next_quarter}
-        - Product Name: {product_name}
-
-        ### Input Data:
-        - PRD Strategic Direction:
-        {prd_content_raw}
+            },
+
+            "name": {"type": "STRING"}, 
+            "description": {"type": "STRING"}, 
+            "problem_statement": {"type": "STRING"}, 
+            "user_stories": {"type": "ARRAY", "items": {"type": "STRING"}}, 
+            "status": {"type": "STRING"}, 
+            "references": { 
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "source": {"type": "STRING"},
+                        "quote": {"type": "STRING"}
+                    },
+                    "required": ["source", "quote"]
+                }
+            },
+
+            "bugs": { 
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "description": {"type": "STRING"},
+                        "impact": {"type": "STRING"},
+                        "frequency": {"type": "STRING"},
+                        "references": {
+                            "type": "ARRAY",
+                            "items": {
+                                "type": "OBJECT",
+                                "properties": {
+                                    "source": {"type": "STRING"},
+                                    "quote": {"type": "STRING"}
+                                },
+                                "required": ["source", "quote"]
+                            }
+                        }
+                    },
+                    "required": ["description", "impact"]
+                }
+            },
+
+            "summary": {"type": "STRING"}, 
+
+            "answer": {"type": "STRING"}, 
+            "evidence": { 
+                "type": "ARRAY",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "source": {"type": "STRING"},
+                        "quote": {"type": "STRING"}
+                    },
+                    "required": ["source", "quote"]
+                }
+            },
+            "recommendation": {"type": "STRING"} 
+        },
+        "required": ["type", "overview_text"] 
+    }
+)
 
-        - User Feedback Summary:
-        {feedback_content}
 
-        ### User Request:
-        {user_prompt}
+ROADMAP_PROMPT_INSTRUCTIONS = """
 
         ### Instructions for JSON Generation:
         - Always return a valid JSON object. The top-level object MUST contain:
@@ -138,8 +164,8 @@ def generate_roadmap_endpoint():
             - **Crucially for 'overview_text' (Concise Roadmap Summary):** This text MUST provide a **high-level, strategic summary** of the generated roadmap. It should be concise and avoid repeating the detailed feature descriptions found within the `initiatives` array. Structure this overview using markdown headings (`##`) for the following sections and provide brief, strategic content for each. If integrating bug fixes, add a "## Key Issues Identified" section.
 
                 ## Introduction / Overview
-                - Purpose of this roadmap (e.g., Q:{{Quarter}} {{Year}} roadmap for {{Product Name}}).
-                - Brief summary of the product (e.g., what {{Product Name}} is and what it aims to do).
+                - Purpose of this roadmap (e.g., Q:{Quarter} {Year} roadmap for {Product Name}).
+                - Brief summary of the product (e.g., what {Product Name} is and what it aims to do).
                  
                 - ## PRD Strategy Focus ← Only if "PRD only" requested
                 - ## User Feedback Focus ← Only if "user feedback only" requested 
@@ -207,128 +233,156 @@ def generate_roadmap_endpoint():
         - Keep output clean, strategic, and grounded in source material. Avoid hallucinations.
         """
 
-       
-        generation_config = GenerationConfig(
-            temperature=0.7,
-            max_output_tokens=8192,
-            response_mime_type="application/json",
-            response_schema={
-                "type": "OBJECT",
-                "properties": {
-                    "type": {"type": "STRING", "enum": ["roadmap", "feature_brief", "bug_list", "strategic_summary", "qa_response"]},
-                    "overview_text": {"type": "STRING"},
-
-                    "initiatives": {
-                        "type": "ARRAY",
-                        "items": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "name": {"type": "STRING"},
-                                "goal": {"type": "STRING"},
-                                "features": {
-                                    "type": "ARRAY",
-                                    "items": {
-                                        "type": "OBJECT",
-                                        "properties": {
-                                            "name": {"type": "STRING"},
-                                            "priority": {"type": "STRING", "enum": ["Highest", "High", "Medium", "Low"]},
-                                            "quarter": {"type": "STRING"},
-                                            "justification": {"type": "STRING"},
-                                            "startDate": {"type": "STRING", "format": "date"},
-                                            "endDate": {"type": "STRING", "format": "date"},
-                                            "status": {"type": "STRING"},
-                                            "assignee": {"type": "STRING"},
-                                            "progress": {"type": "INTEGER", "minimum": 0, "maximum": 100},
-                                            "references": {
-                                                "type": "ARRAY",
-                                                "items": {
-                                                    "type": "OBJECT",
-                                                    "properties": {
-                                                        "source": {"type": "STRING"},
-                                                        "quote": {"type": "STRING"}
-                                                    },
-                                                    "required": ["source", "quote"]
-                                                }
-                                            }
-                                        },
-                                        "required": ["name", "priority", "quarter", "justification", "startDate", "endDate", "status", "assignee", "progress", "references"]
-                                    }
-                                }
-                            },
-                            "required": ["name", "goal", "features"]
-                        }
-                    },
 
-                    "name": {"type": "STRING"}, 
-                    "description": {"type": "STRING"}, 
-                    "problem_statement": {"type": "STRING"}, 
-                    "user_stories": {"type": "ARRAY", "items": {"type": "STRING"}}, 
-                    "status": {"type": "STRING"}, 
-                    "references": { 
-                        "type": "ARRAY",
-                        "items": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "source": {"type": "STRING"},
-                                "quote": {"type": "STRING"}
-                            },
-                            "required": ["source", "quote"]
-                        }
-                    },
+def build_roadmap_prompt_prefix(prd_content_raw, feedback_content):
+    """
+    Builds the part of the roadmap prompt that precedes the user request: system
+    instructions, date context and the uploaded documents. It only depends on the
+    document set, so it can be built once and shared across many prompts.
+    """
+    current_date = datetime.now()
+    current_quarter_num = (current_date.month - 1) // 3 + 1
+    current_quarter_year = current_date.year
+    current_quarter = f"Q{current_quarter_num} {current_quarter_year}"
+
+   
+    next_quarter_month = (current_quarter_num * 3 % 12) + 1
+    next_quarter_year = current_quarter_year
+    if next_quarter_month == 1: 
+        next_quarter_year += 1
+    next_quarter_start = datetime(next_quarter_year, next_quarter_month, 1)
+    next_quarter_num = (next_quarter_start.month - 1) // 3 + 1
+    next_quarter = f"Q{next_quarter_num} {next_quarter_year}"
+
+    
+    product_name = "Your AI-Powered Collaboration Platform" 
+
+
+   
+    prompt_prefix = f"""
+        You are an AI-powered Product Strategy Assistant. Your primary goal is to provide helpful, strategic responses based on the provided Product Requirements Document (PRD) and recent user feedback.
 
-                    "bugs": { 
-                        "type": "ARRAY",
-                        "items": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "description": {"type": "STRING"},
-                                "impact": {"type": "STRING"},
-                                "frequency": {"type": "STRING"},
-                                "references": {
-                                    "type": "ARRAY",
-                                    "items": {
-                                        "type": "OBJECT",
-                                        "properties": {
-                                            "source": {"type": "STRING"},
-                                            "quote": {"type": "STRING"}
-                                        },
-                                        "required": ["source", "quote"]
-                                    }
-                                }
-                            },
-                            "required": ["description", "impact"]
-                        }
-                    },
+        First, **CAREFULLY ANALYZE THE USER'S PROMPT TO DETERMINE THEIR EXPLICIT INTENT.**
 
-                    "summary": {"type": "STRING"}, 
-
-                    "answer": {"type": "STRING"}, 
-                    "evidence": { 
-                        "type": "ARRAY",
-                        "items": {
-                            "type": "OBJECT",
-                            "properties": {
-                                "source": {"type": "STRING"},
-                                "quote": {"type": "STRING"}
-                            },
-                            "required": ["source", "quote"]
-                        }
-                    },
-                    "recommendation": {"type": "STRING"} 
-                },
-                "required": ["type", "overview_text"] 
-            }
-        )
-
-        parsed_response = generate_content_with_ai(
-            system_instruction,
-            generation_config,
-            safety_settings=SAFETY_SETTINGS_RELAXED,
-            chat_history=chat_history_raw
-        )
+        **PRIORITIZATION FOR INTENT CLASSIFICATION:**
+        1. If the user explicitly asks for "bug fixes", "bugs list", or "top bugs", the intent is "bug_list".
+        2. If the user explicitly asks for a "feature brief", "details on a feature", or "brief for [feature name]", the intent is "feature_brief".
+        3. If the user asks for a "roadmap", "plan for QX", "next quarter's initiatives", the intent is "roadmap".
+        4. If the user asks for a "strategic summary", "overall strategy", or "high-level goals", the intent is "strategic_summary".
+        5. For all other general questions, greetings, or unclear requests, the intent is "qa_response".
+
+        **CRITICAL RULE:** If the user's prompt clearly matches one of the explicit intent keywords (e.g., "bug fixes", "feature brief", "roadmap", "strategic summary"), **YOU MUST generate that specific JSON 'type' and its associated structured data.** Do not default to 'qa_response' or 'roadmap' if another type is explicitly requested and better fits.
+
+        **ANALYZE THE USER'S PROMPT FOR MULTIPLE REQUESTS:**
+        - Users may ask for multiple things: "List top 5 bugs AND create a roadmap that addresses them"
+        - Users may ask for combined analysis: "What bugs should we fix in Q4 roadmap?"
+        - Users may ask sequential questions: "Show me bugs, then roadmap to fix them"
+
+        **RESPONSE STRATEGY FOR MULTI-INTENT REQUESTS:**
+        1. If the user asks for MULTIPLE distinct things (e.g., "bugs AND roadmap"), determine the **primary** requested type (e.g., if they end with 'roadmap', then it's 'roadmap').
+        2. Generate the **primary type's JSON structure**.
+        3. **Integrate the secondary analysis/information into the `overview_text` of the primary type.**
+        4. Ensure the structured data (e.g., 'features' in a roadmap) *explicitly* addresses and incorporates the secondary information (e.g., specific bug fixes within a 'stability' initiative).
+        
+        **ANALYZE USER'S SPECIFIC REQUIREMENTS:**
+
+ **Document Source Requirements:**
+   - If user says "only PRD" / "based on PRD" / "PRD only" → Use ONLY PRD Strategic Direction, ignore user feedback
+   - If user says "only user feedback" / "based on feedback" / "user requests only" → Use ONLY User Feedback, ignore PRD
+   - If user says "only tech debt" → Focus on technical improvements, use both docs for context but generate tech-focused features
+   - Otherwise → Use both PRD and User Feedback (default behavior)
+
+        **SPECIAL HANDLING FOR "bugs AND roadmap" requests:**
+        - **Primary type:** "roadmap"
+        - **Include bug analysis in the `overview_text` under a "## Key Issues Identified" section.** This should list the top bugs.
+        - **Reference specific bugs in feature justifications** within the `initiatives` array.
+        - **Ensure the roadmap actually addresses the identified issues** by including initiatives/features focused on these bug fixes (e.g., a "Stability Initiative").
+
+        For ALL responses, include a natural language 'overview_text' that summarizes the main points or directly answers the user's question. This text should be well-formatted using markdown.
+
+        ### Current Context:
+        - Current Date: {current_date.strftime('%Y-%m-%d')}
+        - Current Quarter: {current_quarter}
+        - Next Quarter: {next_quarter}
+        - Product Name: {product_name}
+
+        ### Input Data:
+        - PRD Strategic Direction:
+        {prd_content_raw}
+
+        - User Feedback Summary:
+        {feedback_content}
+
+        ### User Request:
+        """
+    return prompt_prefix
+
+
+def build_roadmap_prompt(prompt_prefix, user_prompt):
+    return prompt_prefix + user_prompt + ROADMAP_PROMPT_INSTRUCTIONS
+
+
+def generate_roadmap(prompt_prefix, user_prompt, chat_history=None):
+    """
+    Runs a single roadmap prompt against a prebuilt prompt prefix.
+    Returns the parsed AI response, or None if it was empty or unparseable.
+    """
+    if user_prompt.lower() in GREETING_PROMPTS:
+        return GREETING_RESPONSE
+
+    return generate_content_with_ai(
+        build_roadmap_prompt(prompt_prefix, user_prompt),
+        ROADMAP_GENERATION_CONFIG,
+        safety_settings=SAFETY_SETTINGS_RELAXED,
+        chat_history=chat_history
+    )
+
+
+def compact_roadmap_response(roadmap):
+    """
+    Drops fields that only duplicate other fields (e.g. 'answer' repeating
+    'overview_text') to shrink the payload. Clients fall back to 'overview_text'.
+    """
+    if roadmap.get("answer") is not None and roadmap.get("answer") == roadmap.get("overview_text"):
+        roadmap = {key: value for key, value in roadmap.items() if key != "answer"}
+    return roadmap
+
+
+@roadmap_bp.route('/generate-roadmap', methods=['POST'])
+def generate_roadmap_endpoint():
+    global _document_store_ref
+
+    try:
+        data = request.get_json()
+        user_prompt = data.get('prompt', '').strip()
+        chat_history_raw = data.get('chatHistory', [])
+        compact = data.get('compact', False)
+
+        if not user_prompt:
+            return jsonify({"error": "Prompt is required"}), 400
+
+        
+        if user_prompt.lower() in GREETING_PROMPTS:
+            return jsonify({"roadmap": compact_roadmap_response(GREETING_RESPONSE) if compact else GREETING_RESPONSE})
+
+        prd_content_raw = _document_store_ref.get("prd_content")
+        feedback_content = _document_store_ref.get("feedback_content")
+
+        if prd_content_raw is None or feedback_content is None:
+            return jsonify({"error": "PRD and/or User Feedback content not found in backend store. Please upload documents first via /initial-analysis."}), 400
+
+        document_version = _document_store_ref.get("version", 0)
+        parsed_response = None
+        if not chat_history_raw:
+            parsed_response = take_prefetched_response(document_version, user_prompt)
+
+        if parsed_response is None:
+            prompt_prefix = build_roadmap_prompt_prefix(prd_content_raw, feedback_content)
+            parsed_response = generate_roadmap(prompt_prefix, user_prompt, chat_history=chat_history_raw)
 
         if parsed_response:
-            
+            if compact:
+                parsed_response = compact_roadmap_response(parsed_response)
             return jsonify({"roadmap": parsed_response})
         else:
             return jsonify({"error": "AI response was empty or could not be processed. Check backend logs for details."}), 500
@@ -340,6 +394,110 @@ def generate_roadmap_endpoint():
         print(f"Error in /generate-roadmap: {e}")
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+
+@roadmap_bp.route('/generate-roadmap/batch', methods=['POST'])
+def generate_roadmap_batch_endpoint():
+    """
+    Runs many prompts against the current document set. The prompt prefix is built
+    once and shared; prompts run with bounded concurrency and each result is streamed
+    back as a newline-delimited JSON line as soon as it completes.
+    """
+    global _document_store_ref
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+
+    prompts = data.get('prompts')
+    chat_history_raw = data.get('chatHistory', [])
+    compact = data.get('compact', False)
+
+    if not isinstance(prompts, list) or not prompts:
+        return jsonify({"error": "A non-empty 'prompts' list is required"}), 400
+    if len(prompts) > BATCH_MAX_PROMPTS:
+        return jsonify({"error": f"At most {BATCH_MAX_PROMPTS} prompts can be sent in one batch"}), 400
+
+    # Non-string items are kept as None so run_item reports them per item instead of
+    # sending their Python repr to the model.
+    prompts = [p.strip() if isinstance(p, str) else None for p in prompts]
+
+    try:
+        max_concurrency = int(data.get('maxConcurrency', BATCH_MAX_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'maxConcurrency' must be an integer"}), 400
+    max_concurrency = max(1, min(max_concurrency, BATCH_MAX_CONCURRENCY))
+
+    prd_content_raw = _document_store_ref.get("prd_content")
+    feedback_content = _document_store_ref.get("feedback_content")
+
+    if prd_content_raw is None or feedback_content is None:
+        return jsonify({"error": "PRD and/or User Feedback content not found in backend store. Please upload documents first via /initial-analysis."}), 400
+
+    prompt_prefix = build_roadmap_prompt_prefix(prd_content_raw, feedback_content)
+
+    def run_item(index, user_prompt):
+        item = {"index": index, "prompt": user_prompt}
+        if user_prompt is None:
+            item["error"] = "Prompt must be a string"
+            return item
+        if not user_prompt:
+            item["error"] = "Prompt is required"
+            return item
+        try:
+            parsed_response = generate_roadmap(prompt_prefix, user_prompt, chat_history=chat_history_raw)
+            if parsed_response:
+                item["roadmap"] = compact_roadmap_response(parsed_response) if compact else parsed_response
+            else:
+                item["error"] = "AI response was empty or could not be processed. Check backend logs for details."
+        except ValueError as e:
+            item["error"] = f"AI generation error: {str(e)}"
+        except Exception as e:
+            print(f"Error in /generate-roadmap/batch item {index}: {e}")
+            item["error"] = f"Unexpected error: {str(e)}"
+        return item
+
+    def stream_results():
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        try:
+            futures = [executor.submit(profile_thread_target(run_item), i, p) for i, p in enumerate(prompts)]
+            for future in as_completed(futures):
+                yield current_app.json.dumps(future.result()) + "\n"
+        finally:
+            # If the client disconnects the generator is closed here; drop queued
+            # prompts instead of blocking this worker until they all finish.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(stream_results()), mimetype='application/x-ndjson')
+
+
+def schedule_roadmap_prefetch():
+    """
+    Prefetches common first follow-ups for the current document set into the
+    response cache. Does nothing unless PREFETCH_ENABLED is set.
+    """
+    prd_content_raw = _document_store_ref.get("prd_content")
+    feedback_content = _document_store_ref.get("feedback_content")
+    if prd_content_raw is None or feedback_content is None:
+        return
+
+    document_version = _document_store_ref.get("version", 0)
+    prompt_prefix = build_roadmap_prompt_prefix(prd_content_raw, feedback_content)
+
+    schedule_prefetch(
+        document_version,
+        lambda user_prompt: generate_roadmap(prompt_prefix, user_prompt),
+        lambda: _document_store_ref.get("version", 0) == document_version
+    )
+
+
+@roadmap_bp.route('/prefetch/stats', methods=['GET'])
+def prefetch_stats_endpoint():
+    return jsonify({
+        "prefetch": get_prefetch_stats(),
+        "cache": get_response_cache_stats()
+    })
+
+
 def set_document_store(store):
     global _document_store_ref
-    _document_store_ref = store
\ No newline at end of file
+    _document_store_ref = store
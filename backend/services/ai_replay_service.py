@@ -0,0 +1,171 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from config import AI_REPLAY_MODE, AI_RECORDINGS_PATH, AI_REPLAY_LATENCY_SCALE, AI_REPLAY_STRICT
+
+_archive_lock = threading.Lock()
+_recordings = None
+_fallback_positions = {}
+
+
+def is_record_mode():
+    return AI_REPLAY_MODE == "record"
+
+
+def is_replay_mode():
+    return AI_REPLAY_MODE == "replay"
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Prompts embed the date they were sent on; strip it so recordings match on later days.
+_DATE_CONTEXT_PATTERN = re.compile(r"(Current Date|Current Quarter|Next Quarter): [^\n]*")
+
+
+def normalize_prompt_for_replay(prompt_text):
+    return _DATE_CONTEXT_PATTERN.sub(r"\1: <date>", prompt_text)
+
+
+def prompt_fingerprint(prompt_text, chat_history=None):
+    return _sha256(json.dumps([normalize_prompt_for_replay(prompt_text), chat_history or []], sort_keys=True, default=str))
+
+
+def config_to_dict(generation_config):
+    to_dict = getattr(generation_config, "to_dict", None)
+    if callable(to_dict):
+        return to_dict()
+    if isinstance(generation_config, dict):
+        return generation_config
+    return {"repr": repr(generation_config)}
+
+
+def config_fingerprint(generation_config):
+    return _sha256(json.dumps(config_to_dict(generation_config), sort_keys=True, default=str))
+
+
+def response_shape(parsed_result):
+    if isinstance(parsed_result, dict):
+        return sorted(parsed_result.keys())
+    return type(parsed_result).__name__
+
+
+def record_ai_call(prompt_text, generation_config, chat_history, generated_text, latency, parsed_result=None):
+    """
+    Appends one AI call to the recordings archive (gzip-compressed JSON lines).
+    generated_text is None for empty or blocked responses.
+    """
+    recording = {
+        "promptHash": prompt_fingerprint(prompt_text, chat_history),
+        "configHash": config_fingerprint(generation_config),
+        "config": config_to_dict(generation_config),
+        "text": generated_text,
+        "latency": round(latency, 4),
+        "shape": response_shape(parsed_result),
+        "recordedAt": time.time()
+    }
+    line = json.dumps(recording, separators=(",", ":"), default=str) + "\n"
+
+    archive_path = _process_archive_path(AI_RECORDINGS_PATH)
+    try:
+        with _archive_lock:
+            directory = os.path.dirname(archive_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Each append adds a gzip member; gzip.open reads them back as one stream.
+            with gzip.open(archive_path, "at", encoding="utf-8") as archive:
+                archive.write(line)
+    except OSError as e:
+        print(f"WARNING: Could not write AI recording to {archive_path}: {e}")
+
+
+def _split_archive_path(path):
+    directory, name = os.path.split(path)
+    stem, dot, suffix = name.partition(".")
+    return directory, stem, dot + suffix
+
+
+def _process_archive_path(path):
+    """
+    Each process appends to its own archive (e.g. ai_calls.<pid>.jsonl.gz), so
+    several server workers never interleave writes to one gzip file.
+    """
+    directory, stem, suffix = _split_archive_path(path)
+    return os.path.join(directory, f"{stem}.{os.getpid()}{suffix}")
+
+
+def load_recordings(path=AI_RECORDINGS_PATH):
+    """
+    Loads the archive at path plus every per-process archive next to it, ordered
+    by recording time.
+    """
+    directory, stem, suffix = _split_archive_path(path)
+    archive_paths = set(glob.glob(os.path.join(directory, f"{stem}.*{suffix}")))
+    if os.path.exists(path):
+        archive_paths.add(path)
+
+    recordings = []
+    for archive_path in sorted(archive_paths):
+        with gzip.open(archive_path, "rt", encoding="utf-8") as archive:
+            for line in archive:
+                if line.strip():
+                    recordings.append(json.loads(line))
+    recordings.sort(key=lambda recording: recording["recordedAt"])
+    return recordings
+
+
+def _get_recordings():
+    global _recordings
+    if _recordings is None:
+        with _archive_lock:
+            if _recordings is None:
+                by_prompt = {}
+                by_config = {}
+                for recording in load_recordings():
+                    by_prompt.setdefault((recording["promptHash"], recording["configHash"]), recording)
+                    by_config.setdefault(recording["configHash"], []).append(recording)
+                _recordings = {"by_prompt": by_prompt, "by_config": by_config}
+    return _recordings
+
+
+def find_recording(prompt_text, generation_config, chat_history=None):
+    """
+    Looks up the recording for an exact prompt (ignoring its date context) and config.
+    With AI_REPLAY_STRICT disabled, a miss falls back to recordings with the same
+    config in round-robin order; which one a call gets then depends on call order,
+    so only use it for sequential benchmarks with synthetic inputs.
+    """
+    recordings = _get_recordings()
+    config_hash = config_fingerprint(generation_config)
+    recording = recordings["by_prompt"].get((prompt_fingerprint(prompt_text, chat_history), config_hash))
+    if recording is not None or AI_REPLAY_STRICT:
+        return recording
+
+    candidates = recordings["by_config"].get(config_hash)
+    if not candidates:
+        return None
+    with _archive_lock:
+        position = _fallback_positions.get(config_hash, 0)
+        _fallback_positions[config_hash] = position + 1
+    return candidates[position % len(candidates)]
+
+
+def replay_ai_call(prompt_text, generation_config, chat_history=None):
+    """
+    Returns the recorded raw response text for a call, after sleeping for the
+    recorded latency scaled by AI_REPLAY_LATENCY_SCALE.
+    """
+    recording = find_recording(prompt_text, generation_config, chat_history)
+    if recording is None:
+        raise ValueError(f"No AI recording found for prompt (first 100 chars): {prompt_text[:100]}")
+
+    if AI_REPLAY_LATENCY_SCALE > 0:
+        time.sleep(recording["latency"] * AI_REPLAY_LATENCY_SCALE)
+    return recording["text"]
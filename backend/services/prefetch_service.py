@@ -0,0 +1,203 @@
+import threading
+import time
+
+from config import (
+    PREFETCH_ENABLED, PREFETCH_MAX_CALLS_PER_UPLOAD,
+    PREFETCH_IDLE_POLL_SECONDS, PREFETCH_IDLE_TIMEOUT_SECONDS, PREFETCH_WAIT_TIMEOUT_SECONDS
+)
+from services.response_cache import (
+    normalize_prompt, store_cached_response, pop_cached_response, clear_response_cache
+)
+
+# Follow-ups users almost always ask right after uploading documents, in priority
+# order. The first phrasing is sent to the model; all phrasings share the result.
+PREFETCH_TARGETS = [
+    (1, [
+        "Create a roadmap for next quarter",
+        "Generate a roadmap for next quarter",
+        "Roadmap for next quarter",
+        "Create a roadmap for the next quarter",
+        "Generate a roadmap for the next quarter",
+        "What is the roadmap for next quarter"
+    ]),
+    (2, [
+        "What are the top bugs",
+        "List the top bugs",
+        "Show me the top bugs",
+        "Top bugs"
+    ]),
+    (3, [
+        "Give me a strategic summary",
+        "Strategic summary",
+        "Generate a strategic summary",
+        "Provide a strategic summary"
+    ]),
+]
+
+_state_lock = threading.Lock()
+_current_cancel_event = None
+_foreground_requests = 0
+# (document version, normalized prompt) -> Event set when that prefetch finishes.
+_in_flight = {}
+_stats = {
+    "runs": 0,
+    "generated": 0,
+    "failed": 0,
+    "cancelled": 0,
+    "idleTimeouts": 0,
+    "waitedOnInFlight": 0
+}
+
+
+def begin_foreground_request():
+    global _foreground_requests
+    with _state_lock:
+        _foreground_requests += 1
+
+
+def end_foreground_request():
+    global _foreground_requests
+    with _state_lock:
+        _foreground_requests = max(0, _foreground_requests - 1)
+
+
+def cancel_prefetch():
+    global _current_cancel_event
+    with _state_lock:
+        if _current_cancel_event is not None:
+            _current_cancel_event.set()
+            _current_cancel_event = None
+
+
+def schedule_prefetch(document_version, generate_fn, is_current_fn):
+    """
+    Starts a background run that generates PREFETCH_TARGETS into the response cache
+    for document_version. Any previous run is cancelled. generate_fn(prompt) returns
+    a parsed response; is_current_fn() tells whether the documents are unchanged.
+    """
+    global _current_cancel_event
+    cancel_prefetch()
+    clear_response_cache(keep_version=document_version)
+
+    if not PREFETCH_ENABLED or PREFETCH_MAX_CALLS_PER_UPLOAD <= 0:
+        return
+
+    cancel_event = threading.Event()
+    with _state_lock:
+        _current_cancel_event = cancel_event
+        _stats["runs"] += 1
+
+    threading.Thread(
+        target=_run_prefetch,
+        args=(document_version, generate_fn, is_current_fn, cancel_event),
+        daemon=True
+    ).start()
+
+
+def _wait_for_idle(cancel_event):
+    deadline = time.time() + PREFETCH_IDLE_TIMEOUT_SECONDS
+    while not cancel_event.is_set():
+        with _state_lock:
+            if _foreground_requests == 0:
+                return True
+        if time.time() >= deadline:
+            with _state_lock:
+                _stats["idleTimeouts"] += 1
+            return False
+        cancel_event.wait(PREFETCH_IDLE_POLL_SECONDS)
+    return False
+
+
+def _is_cancelled(cancel_event, is_current_fn):
+    if cancel_event.is_set() or not is_current_fn():
+        cancel_event.set()
+        with _state_lock:
+            _stats["cancelled"] += 1
+        return True
+    return False
+
+
+def _run_prefetch(document_version, generate_fn, is_current_fn, cancel_event):
+    targets = sorted(PREFETCH_TARGETS, key=lambda target: target[0])
+    for _, prompts in targets[:PREFETCH_MAX_CALLS_PER_UPLOAD]:
+        idle = _wait_for_idle(cancel_event)
+        if _is_cancelled(cancel_event, is_current_fn) or not idle:
+            return
+
+        keys = _mark_in_flight(document_version, prompts)
+        try:
+            if not _prefetch_one(document_version, prompts, generate_fn, is_current_fn, cancel_event):
+                return
+        finally:
+            _clear_in_flight(keys)
+
+
+def _mark_in_flight(document_version, prompts):
+    done_event = threading.Event()
+    keys = [(document_version, normalize_prompt(prompt)) for prompt in prompts]
+    with _state_lock:
+        for key in keys:
+            _in_flight[key] = done_event
+    return keys
+
+
+def _clear_in_flight(keys):
+    with _state_lock:
+        done_events = {_in_flight.pop(key, None) for key in keys}
+    for done_event in done_events:
+        if done_event is not None:
+            done_event.set()
+
+
+def _prefetch_one(document_version, prompts, generate_fn, is_current_fn, cancel_event):
+    """
+    Generates and caches one prefetch target. Returns False if the run was cancelled.
+    """
+    try:
+        response = generate_fn(prompts[0])
+    except Exception as e:
+        print(f"Prefetch error for '{prompts[0]}': {e}")
+        with _state_lock:
+            _stats["failed"] += 1
+        return True
+
+    if _is_cancelled(cancel_event, is_current_fn):
+        return False
+    if not response:
+        with _state_lock:
+            _stats["failed"] += 1
+        return True
+
+    store_cached_response(document_version, prompts, response)
+    with _state_lock:
+        _stats["generated"] += 1
+    print(f"Prefetched response for '{prompts[0]}' (documents v{document_version})")
+    return True
+
+
+def take_prefetched_response(document_version, prompt):
+    """
+    Returns the prefetched response for a prompt, if any. If that prefetch is still
+    being generated, waits for it (up to PREFETCH_WAIT_TIMEOUT_SECONDS) instead of
+    letting the caller start an identical AI call. When prefetch is disabled the
+    cache is not consulted, so lookups do not count as misses.
+    """
+    if not PREFETCH_ENABLED:
+        return None
+
+    with _state_lock:
+        done_event = _in_flight.get((document_version, normalize_prompt(prompt)))
+        if done_event is not None:
+            _stats["waitedOnInFlight"] += 1
+    if done_event is not None:
+        done_event.wait(PREFETCH_WAIT_TIMEOUT_SECONDS)
+    return pop_cached_response(document_version, prompt)
+
+
+def get_prefetch_stats():
+    with _state_lock:
+        stats = dict(_stats)
+        stats["enabled"] = PREFETCH_ENABLED
+        stats["foregroundRequests"] = _foreground_requests
+        stats["inFlight"] = len(set(map(id, _in_flight.values())))
+    return stats
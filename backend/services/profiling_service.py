@@ -0,0 +1,254 @@
+import cProfile
+import glob
+import hmac
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from config import (
+    PROFILING_ENABLED, PROFILE_HEADER, PROFILE_SAMPLE_RATE,
+    PROFILE_DIR, PROFILE_MAX_REPORTS, PROFILE_ADMIN_TOKEN
+)
+
+REPORT_TOP_FUNCTIONS = 30
+REPORT_TOP_ALLOCATIONS = 30
+
+# cProfile and tracemalloc are process-wide, so only one request is profiled at a time.
+_profile_lock = threading.Lock()
+# Set only in the thread of the request being profiled, so helper threads started
+# by other (unprofiled) requests are never attributed to it.
+_request_local = threading.local()
+
+
+def has_valid_admin_token(request):
+    """
+    True only when PROFILE_ADMIN_TOKEN is configured and the request carries it.
+    """
+    if not PROFILE_ADMIN_TOKEN:
+        return False
+    # Compare bytes: compare_digest rejects non-ASCII str, and a malformed token
+    # must read as "not authorized" rather than fail the request.
+    supplied_token = request.headers.get("X-Admin-Token", "")
+    return hmac.compare_digest(
+        supplied_token.encode("utf-8", "surrogateescape"),
+        PROFILE_ADMIN_TOKEN.encode("utf-8")
+    )
+
+
+def should_profile(request):
+    if not PROFILING_ENABLED:
+        return False
+    if request.headers.get(PROFILE_HEADER) == "1" and has_valid_admin_token(request):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_profile():
+    """
+    Starts cProfile and tracemalloc for the current request. Returns None if another
+    request is already being profiled. Threads the request starts through
+    profile_thread_target are profiled too and merged into the same report.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    start_snapshot = tracemalloc.take_snapshot()
+    # If tracemalloc was already tracing, its peak covers the whole process; measure
+    # this request's peak only.
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    state = {
+        "profiler": profiler,
+        "thread_profilers": [],
+        "thread_profilers_lock": threading.Lock(),
+        "started_tracemalloc": started_tracemalloc,
+        "start_time": time.time(),
+        "start_snapshot": start_snapshot
+    }
+    _request_local.profile_state = state
+    return state
+
+
+def profile_thread_target(target):
+    """
+    Wraps a helper thread's target so that, when called from a request that is being
+    profiled, the thread runs under its own profiler whose stats are merged into the
+    request's report. Returns target unchanged otherwise.
+    """
+    state = getattr(_request_local, "profile_state", None)
+    if state is None:
+        return target
+
+    def profiled_target(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Interpreters that allow only one active profiler run the thread unprofiled.
+            return target(*args, **kwargs)
+        try:
+            return target(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with state["thread_profilers_lock"]:
+                state["thread_profilers"].append(profiler)
+
+    return profiled_target
+
+
+def _stop_profile(state):
+    state["profiler"].disable()
+    _request_local.profile_state = None
+    # Read the peak before snapshotting, which itself allocates.
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    end_snapshot = tracemalloc.take_snapshot()
+    if state["started_tracemalloc"]:
+        tracemalloc.stop()
+    _profile_lock.release()
+    return end_snapshot, peak_bytes
+
+
+def abort_profile(state):
+    state["profiler"].disable()
+    _request_local.profile_state = None
+    if state["started_tracemalloc"]:
+        tracemalloc.stop()
+    _profile_lock.release()
+
+
+def _merged_stats(state):
+    stats = pstats.Stats(state["profiler"])
+    with state["thread_profilers_lock"]:
+        for thread_profiler in state["thread_profilers"]:
+            stats.add(thread_profiler)
+    return stats
+
+
+def _function_rows(stats):
+    rows = []
+    for (filename, line, function), (_, call_count, total_time, cumulative_time, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({function})",
+            "calls": call_count,
+            "totalTime": round(total_time, 6),
+            "cumulativeTime": round(cumulative_time, 6)
+        })
+    by_cumulative = sorted(rows, key=lambda row: row["cumulativeTime"], reverse=True)[:REPORT_TOP_FUNCTIONS]
+    by_total = sorted(rows, key=lambda row: row["totalTime"], reverse=True)[:REPORT_TOP_FUNCTIONS]
+    selected = {row["function"]: row for row in by_cumulative + by_total}
+    return sorted(selected.values(), key=lambda row: row["cumulativeTime"], reverse=True)
+
+
+def _allocation_rows(start_snapshot, end_snapshot):
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    differences = end_snapshot.filter_traces(filters).compare_to(
+        start_snapshot.filter_traces(filters), "lineno"
+    )
+    rows = []
+    for difference in differences[:REPORT_TOP_ALLOCATIONS]:
+        frame = difference.traceback[0]
+        rows.append({
+            "site": f"{frame.filename}:{frame.lineno}",
+            "sizeDiff": difference.size_diff,
+            "countDiff": difference.count_diff
+        })
+    return rows
+
+
+def profile_report_id(state, request_path):
+    return f"{int(state['start_time'] * 1000)}-{os.getpid()}-{request_path.strip('/').replace('/', '_') or 'root'}"
+
+
+def finish_profile(state, request_path, method, status_code):
+    """
+    Stops profiling and writes a JSON report (plus the raw .prof stats) to
+    PROFILE_DIR. Returns the report id.
+    """
+    end_snapshot, peak_bytes = _stop_profile(state)
+    duration = time.time() - state["start_time"]
+
+    report_id = profile_report_id(state, request_path)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats = _merged_stats(state)
+    stats.dump_stats(os.path.join(PROFILE_DIR, f"{report_id}.prof"))
+
+    report = {
+        "id": report_id,
+        "path": request_path,
+        "method": method,
+        "status": status_code,
+        "startedAt": state["start_time"],
+        "durationSeconds": round(duration, 4),
+        "peakTracedBytes": peak_bytes,
+        "threadsProfiled": 1 + len(state["thread_profilers"]),
+        "functions": _function_rows(stats),
+        "allocations": _allocation_rows(state["start_snapshot"], end_snapshot)
+    }
+    with open(os.path.join(PROFILE_DIR, f"{report_id}.json"), "w") as report_file:
+        json.dump(report, report_file, separators=(",", ":"))
+
+    _prune_reports()
+    print(f"Profiled {method} {request_path} in {duration:.2f} seconds, report {report_id}")
+    return report_id
+
+
+def _report_paths():
+    return sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")), key=os.path.getmtime, reverse=True)
+
+
+def _prune_reports():
+    for report_path in _report_paths()[PROFILE_MAX_REPORTS:]:
+        for path in (report_path, report_path[:-len(".json")] + ".prof"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_recent_reports(limit=PROFILE_MAX_REPORTS):
+    reports = []
+    for report_path in _report_paths()[:limit]:
+        try:
+            with open(report_path) as report_file:
+                reports.append(json.load(report_file))
+        except (OSError, ValueError):
+            continue
+    return reports
+
+
+def summarize_reports(reports, top=20):
+    """
+    Aggregates hotspots (by total time spent in each function) and allocation sites
+    (by net bytes allocated) across profiled requests.
+    """
+    functions = {}
+    allocations = {}
+    for report in reports:
+        for row in report["functions"]:
+            entry = functions.setdefault(row["function"], {"function": row["function"], "calls": 0, "totalTime": 0.0, "cumulativeTime": 0.0, "requests": 0})
+            entry["calls"] += row["calls"]
+            entry["totalTime"] += row["totalTime"]
+            entry["cumulativeTime"] += row["cumulativeTime"]
+            entry["requests"] += 1
+        for row in report["allocations"]:
+            entry = allocations.setdefault(row["site"], {"site": row["site"], "sizeDiff": 0, "countDiff": 0, "requests": 0})
+            entry["sizeDiff"] += row["sizeDiff"]
+            entry["countDiff"] += row["countDiff"]
+            entry["requests"] += 1
+
+    for entry in functions.values():
+        entry["totalTime"] = round(entry["totalTime"], 6)
+        entry["cumulativeTime"] = round(entry["cumulativeTime"], 6)
+
+    return {
+        "hotspots": sorted(functions.values(), key=lambda entry: entry["totalTime"], reverse=True)[:top],
+        "allocationSites": sorted(allocations.values(), key=lambda entry: entry["sizeDiff"], reverse=True)[:top]
+    }
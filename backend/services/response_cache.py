@@ -0,0 +1,112 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+
+# Entries are kept in insertion order for eviction; _keys maps every phrasing of a
+# prompt to the id of the entry that answers it.
+_entries = OrderedDict()
+_keys = {}
+_cache_lock = threading.Lock()
+_next_entry_id = 0
+_stats = {
+    "stored": 0,
+    "hits": 0,
+    "misses": 0,
+    "evicted": 0,
+    "expired": 0
+}
+
+
+def normalize_prompt(prompt):
+    """
+    Lowercases a prompt and strips punctuation and repeated whitespace, so that
+    trivially different phrasings of the same request share a cache key.
+    """
+    prompt = re.sub(r"[^a-z0-9%\s]", " ", prompt.lower())
+    return " ".join(prompt.split())
+
+
+def _remove_entry(entry_id):
+    entry = _entries.pop(entry_id, None)
+    if entry is not None:
+        for key in entry["keys"]:
+            _keys.pop(key, None)
+
+
+def _is_expired(entry):
+    # Responses embed the current date, so they also go stale at midnight.
+    return (
+        time.time() - entry["created_at"] > RESPONSE_CACHE_TTL_SECONDS
+        or entry["created_on"] != date.today()
+    )
+
+
+def store_cached_response(document_version, prompts, response):
+    """
+    Stores a response under every given phrasing of a prompt for one document version.
+    Entries are served once: a hit removes every key of the entry.
+    """
+    global _next_entry_id
+    with _cache_lock:
+        keys = [(document_version, normalize_prompt(prompt)) for prompt in prompts]
+        for key in keys:
+            if key in _keys:
+                _remove_entry(_keys[key])
+
+        entry_id = _next_entry_id
+        _next_entry_id += 1
+        _entries[entry_id] = {
+            "response": response,
+            "keys": keys,
+            "created_at": time.time(),
+            "created_on": date.today()
+        }
+        for key in keys:
+            _keys[key] = entry_id
+        _stats["stored"] += 1
+
+        while len(_entries) > RESPONSE_CACHE_MAX_ENTRIES:
+            _remove_entry(next(iter(_entries)))
+            _stats["evicted"] += 1
+
+
+def pop_cached_response(document_version, prompt):
+    key = (document_version, normalize_prompt(prompt))
+    with _cache_lock:
+        entry_id = _keys.get(key)
+        entry = _entries.get(entry_id) if entry_id is not None else None
+        if entry is not None and _is_expired(entry):
+            _remove_entry(entry_id)
+            _stats["expired"] += 1
+            entry = None
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _remove_entry(entry_id)
+        _stats["hits"] += 1
+        return entry["response"]
+
+
+def clear_response_cache(keep_version=None):
+    with _cache_lock:
+        stale_ids = {entry_id for key, entry_id in _keys.items() if key[0] != keep_version}
+        for entry_id in stale_ids:
+            _remove_entry(entry_id)
+
+
+def get_response_cache_stats():
+    """
+    hitRate is the share of cache lookups (first chat turns) answered from the cache;
+    utilisation is the share of stored responses that were eventually served.
+    """
+    with _cache_lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hitRate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    stats["utilisation"] = round(stats["hits"] / stats["stored"], 3) if stats["stored"] else None
+    return stats
@@ -1,21 +1,67 @@
 
 import json
+import threading
+import time
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, GenerationConfig, Content
 from vertexai.generative_models import HarmCategory, HarmBlockThreshold
 
 from config import PROJECT_ID, REGION, MODEL_NAME
 from utils.json_utils import fix_incomplete_json
+from services.ai_replay_service import is_record_mode, is_replay_mode, record_ai_call, replay_ai_call
+
+_initialized = False
+_initialized_at = None
+_init_lock = threading.Lock()
 
 def initialize_vertex_ai_service():
+    global _initialized, _initialized_at
     try:
         vertexai.init(project=PROJECT_ID, location=REGION)
+        _initialized = True
+        _initialized_at = time.time()
         print(f"Vertex AI Service initialized for project: {PROJECT_ID}, region: {REGION}")
     except Exception as e:
         print(f"Error initializing Vertex AI Service: {e}")
         raise 
 
 
+def ensure_vertex_ai_service():
+    """
+    Initializes Vertex AI once per process on first use. This runs in each worker
+    after fork rather than at import time in a preloading master.
+    """
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                initialize_vertex_ai_service()
+
+
+def is_vertex_ai_service_ready():
+    return _initialized
+
+
+def get_vertex_ai_initialized_at():
+    return _initialized_at
+
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_generative_model():
+    """
+    Returns a process-wide GenerativeModel client, created on first use and shared
+    across requests and threads instead of being rebuilt for every call.
+    """
+    global _model
+    if _model is None:
+        ensure_vertex_ai_service()
+        with _model_lock:
+            if _model is None:
+                _model = GenerativeModel(MODEL_NAME)
+    return _model
+
+
 SAFETY_SETTINGS_RELAXED = {
     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
     HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
@@ -23,12 +69,39 @@ SAFETY_SETTINGS_RELAXED = {
     HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
 }
 
+def parse_ai_response_text(generated_text):
+    """
+    Parses the model's raw JSON text, attempting to repair truncated output.
+    Returns None if the text cannot be parsed even after repair.
+    """
+    try:
+        return json.loads(generated_text)
+    except json.JSONDecodeError as e:
+        print(f"WARNING: JSON parsing failed: {e}. Raw: {generated_text}. Attempting to fix...")
+        fixed_text = fix_incomplete_json(generated_text)
+        try:
+            parsed_result = json.loads(fixed_text)
+            print("DEBUG: Successfully parsed JSON after attempting to fix.")
+            return parsed_result
+        except json.JSONDecodeError as e_fixed:
+            print(f"ERROR: JSON parsing failed even after fixing: {e_fixed}. Final attempt raw: {fixed_text}")
+            return None 
+
+
 def generate_content_with_ai(prompt_text, generation_config, safety_settings=SAFETY_SETTINGS_RELAXED, chat_history=None):
     """
     Helper function to interact with the Vertex AI GenerativeModel.
     Includes robust error handling and JSON parsing/fixing.
+    In AI_REPLAY_MODE "replay" the raw response comes from the recordings archive
+    instead of Vertex AI; in "record" every call is appended to it.
     """
-    model = GenerativeModel(MODEL_NAME)
+    if is_replay_mode():
+        generated_text = replay_ai_call(prompt_text, generation_config, chat_history)
+        if generated_text is None:
+            return None
+        return parse_ai_response_text(generated_text)
+
+    model = get_generative_model()
     contents = []
 
     if chat_history:
@@ -41,11 +114,13 @@ def generate_content_with_ai(prompt_text, generation_config, safety_settings=SAF
     contents.append(Content(role="user", parts=[Part.from_text(prompt_text)]))
 
     try:
+        start_time = time.time()
         response = model.generate_content(
             contents,
             generation_config=generation_config,
             safety_settings=safety_settings
         )
+        latency = time.time() - start_time
 
         print(f"\n--- RAW AI RESPONSE OBJECT for prompt (first 100 chars): {prompt_text[:100]} ---")
         print(response) 
@@ -53,6 +128,8 @@ def generate_content_with_ai(prompt_text, generation_config, safety_settings=SAF
 
         if not response.candidates or not response.candidates[0].content.parts:
             print("WARNING: AI response has no candidates or no content parts (empty response or blocked).")
+            if is_record_mode():
+                record_ai_call(prompt_text, generation_config, chat_history, None, latency)
             return None 
         
         generated_text = response.text
@@ -60,19 +137,9 @@ def generate_content_with_ai(prompt_text, generation_config, safety_settings=SAF
         print(generated_text)
         print("--- END RAW AI RESPONSE TEXT ---\n")
 
-        parsed_result = None
-        try:
-            parsed_result = json.loads(generated_text)
-        except json.JSONDecodeError as e:
-            print(f"WARNING: JSON parsing failed: {e}. Raw: {generated_text}. Attempting to fix...")
-            fixed_text = fix_incomplete_json(generated_text)
-            try:
-                parsed_result = json.loads(fixed_text)
-                print("DEBUG: Successfully parsed JSON after attempting to fix.")
-            except json.JSONDecodeError as e_fixed:
-                print(f"ERROR: JSON parsing failed even after fixing: {e_fixed}. Final attempt raw: {fixed_text}")
-                return None 
-        
+        parsed_result = parse_ai_response_text(generated_text)
+        if is_record_mode():
+            record_ai_call(prompt_text, generation_config, chat_history, generated_text, latency, parsed_result)
         return parsed_result
 
     except Exception as e:
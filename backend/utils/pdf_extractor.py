@@ -1,16 +1,14 @@
 import io
 
-try:
-    import PyPDF2
-except ImportError:
-    
-    PyPDF2 = None 
 
 def extract_text_from_pdf(pdf_binary_data):
     """
     Extracts text from PDF binary data using PyPDF2.
+    PyPDF2 is imported on first use so it does not slow down worker startup.
     """
-    if PyPDF2 is None:
+    try:
+        import PyPDF2
+    except ImportError:
         print("ERROR: PyPDF2 is not installed or cannot be imported. PDF extraction will not work.")
         return None
 
@@ -0,0 +1,94 @@
+import gzip
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = 500
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/markdown", "text/plain", "text/html"}
+GZIP_COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that always emits compact JSON (no indentation or extra spaces)
+    and uses orjson for encoding when it is installed.
+    """
+    compact = True
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        # Output is always compact, so the separators/indent Flask passes from
+        # response() must not force the slower stdlib encoder.
+        kwargs.pop("separators", None)
+        if kwargs.get("indent") is None:
+            kwargs.pop("indent", None)
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default).decode("utf-8")
+            except TypeError:
+                pass
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+
+def _choose_encoding(accept_encodings):
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response, request):
+    """
+    Compresses a response body with brotli or gzip, depending on what the client
+    accepts. Streamed, small, already-encoded and non-text responses are left as-is.
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = _choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,6 @@
+"""
+Production WSGI entry point, e.g.:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import app